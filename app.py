@@ -1,15 +1,76 @@
+import datetime
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import streamlit as st
-from src.api.model_integration import stream_response
+from src.api.model_integration import (
+    stream_text,
+    complete_response,
+    describe_error,
+    is_timeout_error,
+    NO_RESPONSE_MESSAGE,
+)
 from src.utils.prompt_templates import (
     get_translation_prompt,
     get_sentiment_analysis_prompt,
-    get_cultural_reference_explanation_prompt,
-    get_interactive_translation_prompt,
     get_grammar_focus,
     get_comms_focus,
+    get_combined_analysis_prompt,
 )
 from config.config import Config
 
+# Sidebar options, built once rather than on every rerun
+LANGS = ("English", "Spanish", "French", "German", "Japanese")
+DECODING = ("greedy", "sampling")
+CONTEXTS = ("Formal", "Casual", "Business", "Youth Slang", "Poetic")
+_LANGS_EXCL = {lang: tuple(other for other in LANGS if other != lang) for lang in LANGS}
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+# Static page markup, defined once at import and sent as-is on each rerun
+_CSS = """
+<style>
+:root {
+    --llama-color: #4e8cff;
+    --llama-color-light: #e6f0ff;
+    --llama-color-dark: #1a3a6c;
+    --llama-gradient-start: #4e54c8;
+    --llama-gradient-end: #8f94fb;
+}
+.stApp {
+    margin: auto;
+    background-color: var(--background-color);
+    color: var(--text-color);
+}
+.logo-container {
+    display: flex;
+    justify-content: center;
+    margin-bottom: 1rem;
+}
+.logo-container img {
+    width: 150px;
+}
+</style>
+"""
+
+_HEADER_HTML = """
+<div style="text-align: center;">
+    <h1 class="header-title">🦙 Translator</h1>
+    <p class="header-subtitle">Powered by IBM Watson X language models</p>
+</div>
+<div class="logo-container">
+    <img src="https://www.translatedright.com/wp-content/uploads/2021/10/why-you-shouldnt-use-google-translate-for-business-1-scaled-2560x1280.jpg" alt="Translation Logo">
+</div>
+"""
+
 
 def setup_page():
     """
@@ -21,58 +82,273 @@ def setup_page():
         initial_sidebar_state="expanded",
     )
 
-    st.markdown(
-        """
-        <style>
-        :root {
-            --llama-color: #4e8cff;
-            --llama-color-light: #e6f0ff;
-            --llama-color-dark: #1a3a6c;
-            --llama-gradient-start: #4e54c8;
-            --llama-gradient-end: #8f94fb;
-        }
-        .stApp {
-            margin: auto;
-            background-color: var(--background-color);
-            color: var(--text-color);
-        }
-        .logo-container {
-            display: flex;
-            justify-content: center;
-            margin-bottom: 1rem;
+    st.markdown(_CSS, unsafe_allow_html=True)
+
+
+# Finished analyses are reused for an hour when the inputs are unchanged
+_CACHE_TTL = 3600
+_CACHE_MAX_ENTRIES = 256
+
+
+@st.cache_resource(show_spinner=False)
+def _result_cache():
+    """
+    Process-wide store of finished analyses, shared across sessions and
+    reruns. Maps (model, prompt, params) to (expires_at, output), least
+    recently used first. Sessions run on their own threads, so the dict is
+    only touched while holding the lock returned with it.
+    """
+    return OrderedDict(), threading.Lock()
+
+
+def _cache_key(prompt, model_name, params):
+    return (model_name, prompt, tuple(sorted(params.items())))
+
+
+def _cache_get(key):
+    cache, lock = _result_cache()
+    with lock:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_put(key, output, store=None):
+    # Worker threads pass the _result_cache() pair fetched on the script thread
+    cache, lock = store or _result_cache()
+    with lock:
+        cache[key] = (time.monotonic() + _CACHE_TTL, output)
+        cache.move_to_end(key)
+        while len(cache) > _CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+
+
+def _to_messages(prompt):
+    """
+    Turns a (system, user) prompt pair into chat messages.
+    """
+    system_msg, user_msg = prompt
+    return [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg},
+    ]
+
+
+def run_task(prompt, model_name, params, parts=None, cancel=None, on_output=None):
+    """
+    Runs a single (system, user) analysis prompt against Watson X and
+    returns the text.
+    Streamed chunks are appended to `parts` as they arrive so the script
+    thread can render progress. Pure (no Streamlit calls) so it can run
+    on a worker thread.
+    Stops early and returns None once the `cancel` event is set. A finished
+    reply is handed to `on_output` before returning.
+    """
+    parts = [] if parts is None else parts
+    chunks = stream_text(_to_messages(prompt), model_name, params)
+    try:
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                return None
+            parts.append(chunk)
+    finally:
+        # Ends the request, and frees its slot, if we stopped early
+        chunks.close()
+    output = "".join(parts)
+    if output and on_output is not None:
+        on_output(output)
+    return output
+
+
+# How often partial output from the worker threads is redrawn (seconds)
+_RENDER_INTERVAL = 0.1
+
+
+def run_tasks(tasks, params, placeholders, on_output=None):
+    """
+    Runs every (prompt, model_name) in `tasks` concurrently on a thread pool,
+    drawing the partial output into `placeholders` while the requests stream in.
+    Yields (key, output, error) tuples in completion order.
+    on_output(key, output) is called on the worker thread as each request
+    finishes, so completed work is kept even if the script is interrupted.
+    """
+    parts = {key: [] for key in tasks}
+    rendered = dict.fromkeys(tasks, 0)
+    cancel = threading.Event()
+
+    executor = ThreadPoolExecutor(max_workers=len(tasks))
+    try:
+        futures = {
+            executor.submit(
+                run_task, prompt, model_name, params, parts[key], cancel,
+                partial(on_output, key) if on_output else None,
+            ): key
+            for key, (prompt, model_name) in tasks.items()
         }
-        .logo-container img {
-            width: 150px;
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=_RENDER_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in pending:
+                key = futures[future]
+                if len(parts[key]) > rendered[key]:
+                    rendered[key] = len(parts[key])
+                    placeholders[key].markdown("".join(parts[key]) + "▌")
+            for future in done:
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+    finally:
+        # A rerun interrupts us from inside markdown(); stop the remaining
+        # streams rather than hold it up or let them run on unseen
+        cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.S)
+
+# Non-blank lines that contain no "[" (drops markdown template placeholders)
+_LINE_RE = re.compile(r"^(?!\s*$)(?![^\n]*\[).+$", re.M)
+
+
+def _clean(text):
+    """
+    Splits a response into its non-blank lines, skipping lines with "[".
+    """
+    return _LINE_RE.findall(text)
+
+
+def parse_combined_response(response):
+    """
+    Parses the JSON object returned for the combined analysis prompt.
+    Falls back to the outermost {...} block when the model wraps the JSON
+    in extra text. Returns None if nothing parseable is found.
+    """
+    try:
+        data = json.loads(response)
+    except ValueError:
+        match = _JSON_OBJECT_RE.search(response)
+        if match is None:
+            return None
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def run_combined_task(prompt, keys, model_name, params):
+    """
+    Runs the analyses in `keys` as a single request, with `prompt` asking for
+    exactly those keys, and splits the JSON reply by key.
+    Returns a list of (key, output, error) tuples, or None if the request
+    timed out or the reply could not be parsed so the caller can fall back to
+    one request per analysis.
+    """
+    # One reply carries a section per key, so give it room for each of them
+    combined_params = dict(params, max_new_tokens=params["max_new_tokens"] * len(keys))
+    try:
+        response = complete_response(_to_messages(prompt), model_name, combined_params)
+    except Exception as e:
+        # A long blocking reply can outlast the read timeout; streaming the
+        # analyses separately keeps data flowing and avoids it
+        if is_timeout_error(e):
+            logger.warning("Combined request timed out, falling back")
+            return None
+        return [(key, None, e) for key in keys]
+
+    sections = parse_combined_response(response)
+    if sections is None:
+        logger.warning("Combined response could not be parsed, falling back")
+        return None
+    return [(key, str(sections.get(key) or ""), None) for key in keys]
+
+
+def run_analyses(tasks, params, placeholders, combined=None):
+    """
+    Produces an output for every (prompt, model_name) in `tasks`, serving
+    unchanged analyses from the cache. Misses are requested concurrently, or
+    as one request when `combined` is given as (prompt_args, model_name),
+    prompt_args being get_combined_analysis_prompt's text and language
+    arguments; that prompt then asks only for the analyses still missing.
+    Yields (key, output, error) tuples; successful outputs are cached.
+    Combined replies are cached apart from per-analysis ones, since they come
+    from a different prompt, model and token budget.
+    """
+    task_keys = {
+        key: _cache_key(prompt, model_name, params)
+        for key, (prompt, model_name) in tasks.items()
+    }
+    combined_keys = {}
+    if combined is not None:
+        combined_args, combined_model = combined
+        combined_keys = {
+            key: _cache_key((combined_args, key), combined_model, params)
+            for key in tasks
         }
-        </style>
-        """,
-        unsafe_allow_html=True,
+    pending = {}
+    for key, task in tasks.items():
+        # A per-analysis answer is as good as a combined one, not vice versa
+        output = None
+        if key in combined_keys:
+            output = _cache_get(combined_keys[key])
+        if output is None:
+            output = _cache_get(task_keys[key])
+        if output is None:
+            pending[key] = task
+        else:
+            yield key, output, None
+    if not pending:
+        return
+
+    if combined is not None and len(pending) > 1:
+        combined_prompt = get_combined_analysis_prompt(*combined_args, keys=list(pending))
+        outcomes = run_combined_task(combined_prompt, list(pending), combined_model, params)
+        if outcomes is not None:
+            for key, output, error in outcomes:
+                if output:
+                    _cache_put(combined_keys[key], output)
+                yield key, output, error
+            return
+
+    # Fire the requests at once; the UI is only touched from the script
+    # thread while the responses stream in. Workers cache their own results,
+    # so finished work survives a rerun interrupting this loop.
+    store = _result_cache()
+    yield from run_tasks(
+        pending, params, placeholders,
+        on_output=lambda key, output: _cache_put(task_keys[key], output, store),
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _session_json(params_items, model_name, timestamp, lang, results, score):
+    """
+    Serializes the session summary shown in the sidebar. Cached so unchanged
+    summaries are not re-encoded on every rerun.
+    """
+    source_lang, target_lang, cultural_context = lang
+    session = dict(params_items)
+    session["model"] = model_name
+    session["timestamp"] = timestamp
+    session["lang"] = {"source": source_lang, "target": target_lang, "cultural_context": cultural_context}
+    return json.dumps(
+        {"session": session, "results": results, "score": score},
+        indent=2,
+        ensure_ascii=False,
     )
 
 
 def main():
     setup_page()
 
-    # Header section with title and subtitle
-    st.markdown(
-        """
-        <div style="text-align: center;">
-            <h1 class="header-title">🦙 Translator</h1>
-            <p class="header-subtitle">Powered by IBM Watson X language models</p>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
-
-    # Meta logo
-    st.markdown(
-        """
-        <div class="logo-container">
-            <img src="https://www.translatedright.com/wp-content/uploads/2021/10/why-you-shouldnt-use-google-translate-for-business-1-scaled-2560x1280.jpg" alt="Translation Logo">
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    # Header section with title, subtitle and logo
+    st.markdown(_HEADER_HTML, unsafe_allow_html=True)
 
     # Remove the Llama image display
 
@@ -81,18 +357,16 @@ def main():
         st.title("🦙 Settings")
         
         # Warn if IBM_MODEL_ID is set (overrides dropdown)
-        import os
-        ibm_model_id = os.getenv("IBM_MODEL_ID")
-        if ibm_model_id:
+        if Config.IBM_MODEL_ID:
             st.warning(
                 f"⚠️ **Model Override Active**\n\n"
-                f"Your `.env` file has `IBM_MODEL_ID={ibm_model_id}` set.\n\n"
+                f"Your `.env` file has `IBM_MODEL_ID={Config.IBM_MODEL_ID}` set.\n\n"
                 f"This overrides the dropdown selection. To use the dropdown, remove or comment out `IBM_MODEL_ID` in your `.env` file."
             )
         
         model_name = st.selectbox("Choose a model", Config.AVAILABLE_MODELS)
 
-        decoding = st.selectbox("Choose Method", ["greedy", "sampling"])
+        decoding = st.selectbox("Choose Method", DECODING)
 
         tokens = st.number_input("Choose Number of Tokens", value=200, min_value=100, max_value=1000) 
 
@@ -102,6 +376,22 @@ def main():
 
         top_p = st.slider("Choose Top P", value=0.5, min_value=0.1, max_value=1.0, step=0.1)
 
+        run_all = st.checkbox(
+            "Run all analyses up front",
+            help="Otherwise only the translation runs; other tabs run when you open them and click Run.",
+        )
+
+        single_request = st.checkbox(
+            "Combine analyses into one request",
+            help="When running all analyses, sends one prompt instead of parallel requests.",
+            disabled=not run_all,
+        )
+
+        fast_secondary = st.checkbox(
+            "Use fast model for secondary analyses",
+            help=f"Runs sentiment, grammar and comms on {Config.SECONDARY_MODEL}; translation keeps the model above.",
+        )
+
         params = {
             "decoding_method": decoding,
             "max_new_tokens": tokens,
@@ -110,163 +400,146 @@ def main():
             "top_p": top_p
         }
 
-        langs = ["English", "Spanish", "French", "German", "Japanese"]
-
         source_lang = st.selectbox(
-            "From", langs
+            "From", LANGS
         )
 
-        selected = source_lang
-
         target_lang = st.selectbox(
-            "To", [lang for lang in langs if lang != selected]
+            "To", _LANGS_EXCL[source_lang]
         )
         cultural_context = st.selectbox(
-            "Context", ["Formal", "Casual", "Business", "Youth Slang", "Poetic"]
+            "Context", CONTEXTS
         )
 
     # Main container with border
     main_container = st.container(border=True)
 
     # sidebar results output
-    session_results = {"session": None, "results": None, "score": None}
+    session_results = {"results": None}
 
     with main_container:
         st.header("Enter Text for Translation and Analysis")
-        text = st.text_area(
-            "Text to translate",
-            "It was the best of times, it was the worst of times...",
-            height=200,
-        )
+        # A form holds back reruns while typing; the text (and the character
+        # count below) only update when the form is submitted.
+        with st.form("translate_form", border=False):
+            text = st.text_area(
+                "Text to translate",
+                "It was the best of times, it was the worst of times...",
+                height=200,
+            )
+            submitted = st.form_submit_button("Translate and Analyze", type="primary")
+
+        # ~4 characters per token; very long inputs make prefill dominate
+        # every request, so trim them before anything is sent
+        approx_tokens = max(1, len(text) // 4)
+        if approx_tokens > Config.MAX_INPUT_TOKENS:
+            st.warning(
+                f"Text is about {approx_tokens} tokens; only the first "
+                f"{Config.MAX_INPUT_TOKENS} (~{Config.MAX_INPUT_TOKENS * 4} characters) will be analyzed."
+            )
+            text = text[:Config.MAX_INPUT_TOKENS * 4]
         st.caption(f"Character count: {len(text)}")
 
-        if st.button("Translate and Analyze", type="primary"):
-            if text:
-                # Tabs for different analysis types
-                tab1, tab2, tab5, tab6 = st.tabs(
-                    [
-                        "Translation",
-                        "Sentiment Analysis",
-                        "Grammar Focus",
-                        "Comms Companion"
-                    ]
-                )
-
-                # Tab 1: Translation
-                with tab1:
-                    st.subheader("Result")
-                    translation_container = st.empty()
-                    translation_prompt = get_translation_prompt(
-                        text, source_lang, target_lang, cultural_context
-                    )
-                    translation = stream_response(
-                        [{"role": "user", "content": translation_prompt}],
-                        translation_container,
-                        model_name,
-                        params
-                    )
-                    ret_trans = None
-                    try: 
-                        translation = [el for el in translation.split("\n") if el != "" and el != " " and "[" not in el]
-                        ret_trans = translation
-                        print("ret_trans_try: ", ret_trans["body"])
-                    except Exception as e:
-                        print("ret_trans_except: ", e)
-
-                # Tab 2: Sentiment Analysis
-                with tab2:
-                    st.subheader("Sentiment Analysis")
-                    sentiment_container = st.empty()
-                    sentiment_prompt = get_sentiment_analysis_prompt(text, source_lang)
-                    sentiment_analysis = stream_response(
-                        [{"role": "user", "content": sentiment_prompt}],
-                        sentiment_container,
+        # Analyses run only once requested; results live in session state so
+        # they survive the reruns triggered by the per-tab Run buttons.
+        if "results" not in st.session_state:
+            st.session_state.results = {}
+
+        run_now = set()
+        if submitted and text:
+            secondary_model = Config.SECONDARY_MODEL if fast_secondary else model_name
+            st.session_state.request = {
+                "tasks": {
+                    "translation": (
+                        get_translation_prompt(
+                            text, source_lang, target_lang, cultural_context
+                        ),
                         model_name,
-                        params
-                    )
-                    try: 
-                        sentiment = [el for el in sentiment_analysis.split("\n") if el != "" and el != " " and "[" not in el]
-                        ret_sentiment = sentiment
-                        #print("sentiment output: ", sentiment)
-                    except Exception as e:
-                        print("error: ", e)
-                        ret_sentiment = "Error: " + str(e)
-
-                '''# Tab 3: Cultural References
-                with tab3:
-                    st.subheader("Cultural References")
-                    cultural_container = st.empty()
-                    cultural_prompt = get_cultural_reference_explanation_prompt(
-                        text, source_lang, target_lang
-                    )
-                    cultural_references = stream_response(
-                        [{"role": "user", "content": cultural_prompt}],
-                        cultural_container,
-                        model_name,
-                    )
-                '''
-
-                '''# Tab 4: Interactive Translation
-                with tab4:
-                    st.subheader("Interactive Translation")
-                    interactive_container = st.empty()
-                    interactive_prompt = get_interactive_translation_prompt(
-                        text, source_lang, target_lang
-                    )
-                    interactive_translation = stream_response(
-                        [{"role": "user", "content": interactive_prompt}],
-                        interactive_container,
-                        model_name,
-                    )'''
-
-                # Tab 5: Grammar Focus
-                with tab5:
-                    st.subheader("Grammar")
-                    grammar_container = st.empty()
-                    grammar_prompt = get_grammar_focus(
-                        text, source_lang, target_lang
-                    )
-                    grammar_analysis = stream_response(
-                        [{"role": "user", "content": grammar_prompt}],
-                        grammar_container,
-                        model_name,
-                        params
-                    )
-                    try:
-                        grammar = [el for el in grammar_analysis.split("\n") if el != "" and el != " " and "[" not in el]
-                        ret_grammar = grammar
-                        print("grammar output: ", grammar)
-                    except Exception as e:
-                        print("error: ", e)
-                        ret_grammar = "Error: " + str(e)
-
-                # Tab 6: Teacher Comms Companion
-                with tab6:
-                    st.subheader("Companion")
-                    comms_container = st.empty()
-                    comms_prompt = get_comms_focus(
-                        text, source_lang, target_lang
-                    )
-                    comms_analysis = stream_response(
-                        [{"role": "user", "content": comms_prompt}],
-                        comms_container,
-                        model_name,
-                        params
+                    ),
+                    "sentiment": (
+                        get_sentiment_analysis_prompt(text, source_lang, target_lang),
+                        secondary_model,
+                    ),
+                    "grammar": (
+                        get_grammar_focus(text, source_lang, target_lang),
+                        secondary_model,
+                    ),
+                    "comms": (
+                        get_comms_focus(text, source_lang, target_lang),
+                        secondary_model,
+                    ),
+                },
+                "combined": (
+                    (text, source_lang, target_lang, cultural_context),
+                    model_name,
+                ) if single_request else None,
+                "params": params,
+                "model": model_name,
+                "lang": (source_lang, target_lang, cultural_context),
+            }
+            st.session_state.results = {}
+            run_now = set(st.session_state.request["tasks"]) if run_all else {"translation"}
+
+        request = st.session_state.get("request")
+        if request:
+            # Tabs for different analysis types
+            tab1, tab2, tab5, tab6 = st.tabs(
+                [
+                    "Translation",
+                    "Sentiment Analysis",
+                    "Grammar Focus",
+                    "Comms Companion"
+                ]
+            )
+
+            # Tab 1: Translation, Tab 2: Sentiment Analysis,
+            # Tab 5: Grammar Focus, Tab 6: Teacher Comms Companion
+            tabs = {
+                "translation": (tab1, "Result"),
+                "sentiment": (tab2, "Sentiment Analysis"),
+                "grammar": (tab5, "Grammar"),
+                "comms": (tab6, "Companion"),
+            }
+
+            placeholders = {}
+            for key, (tab, title) in tabs.items():
+                with tab:
+                    st.subheader(title)
+                    output = st.session_state.results.get(key)
+                    if output is not None:
+                        st.markdown(output)
+                    elif key in run_now or st.button("Run analysis", key=f"run_{key}"):
+                        placeholders[key] = st.empty()
+                        placeholders[key].info("🔄 Processing request...")
+
+            errors = {}
+            outcomes = run_analyses(
+                {key: request["tasks"][key] for key in placeholders},
+                request["params"],
+                placeholders,
+                request["combined"],
+            )
+            for key, output, error in outcomes:
+                if output and error is None:
+                    placeholders[key].markdown(output)
+                    st.session_state.results[key] = output
+                    continue
+
+                if error is not None:
+                    errors[key] = describe_error(error)
+                    logger.error(
+                        "Watson X error (%s): %s", key, error,
+                        exc_info=error if logger.isEnabledFor(logging.DEBUG) else None,
                     )
-                    try:
-                        comms = [el for el in comms_analysis.split("\n") if el != "" and el != " " and "[" not in el]
-                        ret_comms = comms
-                        #print("comms output: ", comms)
-                    except Exception as e:
-                        print("error: ", e)
-                        ret_comms = "Error: " + str(e)
-
-                    session_results["results"] = {
-                        "translation": ret_trans,
-                        "sentiment": ret_sentiment,
-                        "grammar": ret_grammar,
-                        "comms": ret_comms
-                    }
+                else:
+                    errors[key] = NO_RESPONSE_MESSAGE
+                placeholders[key].error(errors[key])
+
+            results = {
+                key: _clean(output) for key, output in st.session_state.results.items()
+            }
+            results.update(errors)
+            session_results["results"] = results
 
     # Sidebar for additional information and feedback
     with st.sidebar:
@@ -275,21 +548,30 @@ def main():
     
     # Sidebar for session summary 
     with st.sidebar:
-        import datetime
         st.subheader("Session")
 
         score = st.number_input("Session Score", value=5, min_value=1, max_value=10)
-        session_results["score"] = score
 
-        session_results["session"] = params.copy()
-        session_results["session"]["model"] = model_name
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        session_results["session"]["timestamp"] = timestamp 
-        session_results["session"]["lang"] = {"source": source_lang, "target": target_lang, "cultural_context": cultural_context}
-
-        st.json(session_results)
-
-        
+        # Describe the settings the shown results were produced with, not
+        # whatever the sidebar has been changed to since
+        summary = request or {
+            "params": params,
+            "model": model_name,
+            "lang": (source_lang, target_lang, cultural_context),
+        }
+        # Minute resolution so reruns within the same minute reuse the cache
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        st.code(
+            _session_json(
+                tuple(summary["params"].items()),
+                summary["model"],
+                timestamp,
+                summary["lang"],
+                session_results["results"],
+                score,
+            ),
+            language="json",
+        )
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -5,17 +6,58 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _int_env(name, default, minimum=1):
+    """
+    Read an integer setting, using the default if it is unset, malformed or
+    below `minimum`.
+    """
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = None
+    if number is None or number < minimum:
+        logging.getLogger(__name__).warning(
+            "Ignoring %s=%r (expected an integer >= %d), using %d", name, value, minimum, default
+        )
+        return default
+    return number
+
+
 class Config:
     """
-    Simple configuration class for available models.
+    Simple configuration class for available models and Watson X settings.
+    Environment variables are read once, when this module is imported.
     """
     
     # Available models - Only IBM Watson X models
-    AVAILABLE_MODELS = [
+    AVAILABLE_MODELS = (
         "ibm/granite-4-h-small",
         "meta-llama/llama-3-2-11b-vision-instruct",
         "meta-llama/llama-3-2-90b-vision-instruct",
         "meta-llama/llama-3-3-70b-instruct",
         "meta-llama/llama-4-maverick-17b-128e-instruct-fp8",
         "mistralai/mistral-medium-2505"
-    ]
\ No newline at end of file
+    )
+
+    # Smaller model used for sentiment/grammar/comms when the user opts in
+    SECONDARY_MODEL = os.getenv("IBM_SECONDARY_MODEL", "ibm/granite-3-8b-instruct")
+
+    # Watson X credentials
+    IBM_API_KEY = os.getenv("IBM_API_KEY")
+    IBM_BASE_URL = os.getenv("IBM_BASE_URL")
+    IBM_PROJECT_ID = os.getenv("IBM_PROJECT_ID")
+
+    # Optional: forces this model regardless of the dropdown selection
+    IBM_MODEL_ID = os.getenv("IBM_MODEL_ID")
+
+    # Longer inputs are truncated before being sent (approx. 4 chars/token)
+    MAX_INPUT_TOKENS = _int_env("MAX_INPUT_TOKENS", 3000)
+
+    # Upper bound on simultaneous Watson X requests from this process
+    MAX_CONCURRENT_REQUESTS = _int_env("MAX_CONCURRENT_REQUESTS", 8)
+
+    # Logging level for the app (DEBUG, INFO, WARNING, ERROR)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
@@ -1,16 +1,149 @@
-import os
-from dotenv import load_dotenv
+import atexit
+import contextlib
+import logging
+import re
+import socket
+import threading
+from urllib.parse import urlsplit
+import httpx
 from ibm_watsonx_ai.foundation_models import ModelInference
-from ibm_watsonx_ai import Credentials
-import streamlit as st
+from ibm_watsonx_ai import APIClient, Credentials
+from config.config import Config
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
 
+# Watson X lists the valid model ids when asked for one it doesn't serve
+_SUPPORTED_MODELS_RE = re.compile(r"Supported models: \[(.*?)\]", re.DOTALL)
 
-def get_watsonx_client(model_id, params, project_id=None):
+# User-facing error messages
+NO_RESPONSE_MESSAGE = "No response received from Watson X"
+_ERR_MISSING_CONFIG = "Missing required environment variables: IBM_API_KEY, IBM_BASE_URL, IBM_PROJECT_ID"
+_ERR_UNSUPPORTED_MODEL = "Error: this model is not available for your project. Supported models: {supported}"
+_ERR_TIMEOUT = "Error: Watson X did not respond in time. Try again, or shorten the input."
+_ERR_BUSY = "Error: too many Watson X requests are already in progress. Try again shortly."
+_ERR_GENERIC = "Error: {message}"
+
+# Known failure classes, matched against the words of the error message in
+# order; the first entry sharing a word with it wins
+_AUTH_TOKENS = frozenset({"401", "unauthorized", "authentication"})
+_TIMEOUT_TOKENS = frozenset({"timeout", "timed"})
+_ERROR_TABLE = (
+    (_AUTH_TOKENS, "Error: IBM authentication failed. Check IBM_API_KEY in your .env file."),
+    (frozenset({"403", "forbidden"}), "Error: access denied. Check that your API key has access to IBM_PROJECT_ID."),
+    (frozenset({"404"}), "Error: Watson X endpoint or model not found at {base_url}. Check IBM_BASE_URL and the selected model."),
+    (frozenset({"429"}), "Error: Watson X rate limit reached. Wait a moment and try again."),
+    (frozenset({"500", "502", "503", "504"}), "Error: Watson X is temporarily unavailable ({message}). Try again shortly."),
+)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_REGIONAL_HOST_RE = re.compile(r"[a-z0-9-]+\.cloud\.ibm\.com", re.IGNORECASE)
+
+
+def _normalize_base_url(base_url):
     """
-    Create and return a Watson X ModelInference client.
+    Tidy a Watson X URL, e.g. us-south.cloud.ibm.com/ml/v1/text?x=1
+    becomes https://us-south.ml.cloud.ibm.com.
+    
+    Drops the query string and any /ml/v1 suffix but keeps other paths
+    (e.g. a Cloud Pak for Data prefix), defaults the scheme to https and
+    points a bare regional <region>.cloud.ibm.com host at its
+    <region>.ml.cloud.ibm.com API host. Other hosts are left as they are.
+    """
+    if not base_url:
+        return base_url
+    parts = urlsplit(base_url if "//" in base_url else f"https://{base_url}")
+    host = parts.netloc
+    if _REGIONAL_HOST_RE.fullmatch(host):
+        host = host[:-len(".cloud.ibm.com")] + ".ml.cloud.ibm.com"
+    path = parts.path.split("/ml/v1")[0].rstrip("/")
+    return f"{parts.scheme}://{host}{path}"
+
+
+# Resolved once at import; these don't change while the app is running
+_IBM_API_KEY = Config.IBM_API_KEY
+_IBM_BASE_URL = _normalize_base_url(Config.IBM_BASE_URL)
+_IBM_PROJECT_ID = Config.IBM_PROJECT_ID
+_IBM_MODEL_OVERRIDE = Config.IBM_MODEL_ID
+
+
+def _check_ibm_config():
+    """
+    Return (ready, error message) for the Watson X settings in the env.
+    """
+    if not _IBM_API_KEY or not _IBM_BASE_URL or not _IBM_PROJECT_ID:
+        return False, _ERR_MISSING_CONFIG
+    return True, None
+
+
+_IBM_READY, _IBM_ERROR = _check_ibm_config()
+if not _IBM_READY:
+    logger.warning(_IBM_ERROR)
+
+# One HTTP/2 connection pool shared by every Watson X client, so concurrent
+# analyses are multiplexed over the same connection. httpx.Client is
+# thread-safe for synchronous use. The transport retries failed connection
+# attempts (with backoff) before a request errors out, and enables TCP
+# keepalive so idle pooled connections are probed rather than silently
+# dropped. Connects fail fast; reads get a minute. For chat_stream that
+# bounds the gap between chunks, but a blocking chat() sends nothing until
+# generation finishes, so long non-streamed replies can time out (see
+# is_timeout_error).
+_HTTP_CLIENT = httpx.Client(
+    timeout=httpx.Timeout(60.0, connect=3.05),
+    transport=httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+        retries=3,
+        socket_options=[(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+    ),
+)
+
+
+# Cached SDK clients: APIClient per (base_url, project_id), ModelInference
+# per (base_url, project_id, model_id). Guarded by _CLIENT_LOCK.
+_CLIENT_LOCK = threading.Lock()
+_API_CLIENTS = {}
+_INFERENCE_CLIENTS = {}
+
+# Caps in-flight Watson X requests across all sessions of this process, so a
+# burst of tabs/users queues here instead of tripping the account rate limit.
+# A request that can't get a slot within _SLOT_TIMEOUT seconds fails instead.
+_REQUEST_SLOTS = threading.BoundedSemaphore(Config.MAX_CONCURRENT_REQUESTS)
+_SLOT_TIMEOUT = 30
+
+
+class _RequestSlotTimeout(RuntimeError):
+    """
+    Raised when every request slot stayed busy for _SLOT_TIMEOUT seconds.
+    """
+
+
+@contextlib.contextmanager
+def _request_slot():
+    if not _REQUEST_SLOTS.acquire(timeout=_SLOT_TIMEOUT):
+        raise _RequestSlotTimeout(_ERR_BUSY)
+    try:
+        yield
+    finally:
+        _REQUEST_SLOTS.release()
+
+
+def close_http_client():
+    """
+    Close the shared HTTP pool. Registered to run at interpreter exit.
+    """
+    _HTTP_CLIENT.close()
+
+
+atexit.register(close_http_client)
+
+
+def get_watsonx_client(model_id, project_id=None):
+    """
+    Return a Watson X ModelInference client, reusing a cached instance.
+    
+    Clients are cached per (base_url, project_id, model_id) so the IAM
+    token and HTTP session held by the SDK survive across requests and
+    reruns. Generation parameters are passed per request, see chat_params.
     
     Args:
         model_id: The model identifier (e.g., "meta-llama/llama-3-3-70b-instruct")
@@ -19,129 +152,288 @@ def get_watsonx_client(model_id, params, project_id=None):
     Returns:
         ModelInference: Configured client instance
     """
-    api_key = os.getenv("IBM_API_KEY")
-    base_url = os.getenv("IBM_BASE_URL")
-    project_id = project_id or os.getenv("IBM_PROJECT_ID")
-    
-    # print("key: ", api_key)
-    # print("base_url: ", base_url)
-    # print("project_id: ", project_id)
-    
-    if not api_key or not base_url or not project_id:
-        raise ValueError("Missing required environment variables: IBM_API_KEY, IBM_BASE_URL, IBM_PROJECT_ID")
-    
-    # Clean up base URL (remove query params and paths)
-    if "?" in base_url:
-        base_url = base_url.split("?")[0]
-    if "/ml/v1" in base_url:
-        base_url = base_url.split("/ml/v1")[0]
+    project_id = project_id or _IBM_PROJECT_ID
+    key = (_IBM_BASE_URL, project_id, model_id)
+    model = _INFERENCE_CLIENTS.get(key)
+    if model is None:
+        # Concurrent first requests would otherwise each build a client and
+        # fetch their own token; let one thread build it, the rest reuse it
+        with _CLIENT_LOCK:
+            model = _INFERENCE_CLIENTS.get(key)
+            if model is None:
+                model = ModelInference(
+                    model_id=model_id,
+                    api_client=_get_api_client(project_id)
+                )
+                _INFERENCE_CLIENTS[key] = model
+    return model
+
+
+def _get_api_client(project_id):
+    """
+    Return the APIClient (credentials, IAM token, HTTP pool) for a project,
+    shared by all of its ModelInference clients. Caller holds _CLIENT_LOCK.
+    The env settings are checked once at import, see _check_ibm_config.
+    """
+    key = (_IBM_BASE_URL, project_id)
+    client = _API_CLIENTS.get(key)
+    if client is not None:
+        return client
     
     creds = Credentials(
-        api_key=api_key,
-        url=base_url
+        api_key=_IBM_API_KEY,
+        url=_IBM_BASE_URL
     )
 
-    return ModelInference(
-        model_id=model_id,
+    client = APIClient(
         credentials=creds,
         project_id=project_id,
-        params=params
+        httpx_client=_HTTP_CLIENT
     )
+    _API_CLIENTS[key] = client
+    return client
+
+
+def _error_words(error):
+    return set(_WORD_RE.findall(str(error).lower()))
+
+
+def _is_auth_error(error):
+    """
+    True if Watson X rejected the request's credentials (HTTP 401).
+    """
+    return not _AUTH_TOKENS.isdisjoint(_error_words(error))
+
+
+def _reset_clients():
+    """
+    Drop the cached clients so the next request fetches a fresh IAM token.
+    """
+    logger.info("Watson X rejected the cached credentials, re-authenticating")
+    with _CLIENT_LOCK:
+        _INFERENCE_CLIENTS.clear()
+        _API_CLIENTS.clear()
+
+
+def chat_params(params):
+    """
+    Map the sidebar's generation parameters onto the chat API's names.
+    
+    The chat endpoint takes max_tokens rather than max_new_tokens and has no
+    decoding_method or top_k; greedy decoding is temperature 0.
+    
+    Args:
+        params: Dict with decoding_method, max_new_tokens, temperature, top_p
+        
+    Returns:
+        dict: Parameters for ModelInference.chat / chat_stream
+    """
+    greedy = params.get("decoding_method") == "greedy"
+    return {
+        "max_tokens": params.get("max_new_tokens"),
+        "temperature": 0 if greedy else params.get("temperature"),
+        "top_p": params.get("top_p"),
+    }
+
+
+def _user_message(content):
+    """
+    Wrap text as a Watson X user message with a single text part.
+    """
+    return {"role": "user", "content": [{"type": "text", "text": content}]}
+
+
+# Per-role builders for the chat API message shape; other roles are dropped
+_FORMATTERS = {
+    "user": _user_message,
+    "assistant": lambda content: {"role": "assistant", "content": content},
+    "system": lambda content: {"role": "system", "content": content},
+}
+
+
+def format_messages(messages):
+    """
+    Convert plain chat messages into the Watson X chat API format.
+    
+    Args:
+        messages: List of message dicts with 'role' and 'content'
+        
+    Returns:
+        list: Messages ready to pass to ModelInference.chat
+    """
+    return [
+        _FORMATTERS[role](msg.get("content", ""))
+        for msg in messages
+        if (role := msg.get("role", "user")) in _FORMATTERS
+    ]
 
 
-def chat_with_watsonx(messages, model_id, container, params):
+def chat_text(messages, model_id, params):
     """
-    Send a chat request to Watson X and display the response.
+    Send a chat request to Watson X and return the response text.
+    Does not touch the UI, so it is safe to call from worker threads.
     
     Args:
         messages: List of message dicts with 'role' and 'content'
         model_id: The model identifier to use
-        container: Streamlit container for displaying response
+        params: Generation parameters from the sidebar
         
     Returns:
-        str: The response text, or None if error
+        str: The response text (empty if the model returned nothing)
+    """
+    formatted_messages = format_messages(messages)
+    
+    # Call chat API, re-authenticating once if the cached token was rejected
+    with _request_slot():
+        try:
+            response = get_watsonx_client(model_id).chat(messages=formatted_messages, params=chat_params(params))
+        except Exception as e:
+            if not _is_auth_error(e):
+                raise
+            _reset_clients()
+            response = get_watsonx_client(model_id).chat(messages=formatted_messages, params=chat_params(params))
+    
+    return _response_content(response)
+
+
+def _response_content(response):
+    """
+    Extract the reply text from a (non-streaming) chat response.
     """
+    # The SDK returns the REST payload as a dict
     try:
-        # Show processing indicator
-        response_placeholder = container.empty()
-        response_placeholder.info("🔄 Processing request...")
-        
-        # Get client
-        model = get_watsonx_client(model_id, params)
-        
-        # Format messages for Watson X chat API
-        formatted_messages = []
-        for msg in messages:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            
-            if role == "user":
-                formatted_messages.append({
-                    "role": "user",
-                    "content": [{"type": "text", "text": content}]
-                })
-            elif role == "assistant":
-                formatted_messages.append({
-                    "role": "assistant",
-                    "content": content
-                })
-            elif role == "system":
-                formatted_messages.append({
-                    "role": "system",
-                    "content": content
-                })
+        return response["choices"][0]["message"]["content"] or ""
+    except (KeyError, IndexError, TypeError):
+        return str(response)
+
+
+def iter_chat_text(messages, model_id, params):
+    """
+    Stream a chat request to Watson X, yielding text chunks as they arrive.
+    Does not touch the UI, so it is safe to call from worker threads.
+    
+    Args:
+        messages: List of message dicts with 'role' and 'content'
+        model_id: The model identifier to use
+        params: Generation parameters from the sidebar
         
-        # Call chat API
-        response = model.chat(messages=formatted_messages)
+    Yields:
+        str: Non-empty pieces of the response text
+    """
+    started = False
+    # The slot is held until the stream is fully consumed or closed
+    with _request_slot():
+        try:
+            for content in _iter_chat_chunks(messages, model_id, params):
+                started = True
+                yield content
+        except Exception as e:
+            # Re-authenticate once if the cached token was rejected up front
+            if started or not _is_auth_error(e):
+                raise
+            _reset_clients()
+            yield from _iter_chat_chunks(messages, model_id, params)
+
+
+def _iter_chat_chunks(messages, model_id, params):
+    model = get_watsonx_client(model_id)
+    formatted_messages = format_messages(messages)
+    
+    # SDK releases without chat_stream: deliver the whole reply as one chunk
+    if not hasattr(model, "chat_stream"):
+        content = _response_content(model.chat(messages=formatted_messages, params=chat_params(params)))
+        if content:
+            yield content
+        return
+    
+    for chunk in model.chat_stream(messages=formatted_messages, params=chat_params(params)):
+        choices = chunk.get("choices") or []
+        if choices:
+            content = choices[0].get("delta", {}).get("content")
+            if content:
+                yield content
+
+
+def is_timeout_error(error):
+    """
+    True if a Watson X request failed because the server didn't answer in
+    time, whether httpx raised it directly or the SDK wrapped it.
+    """
+    return isinstance(error, httpx.TimeoutException) or not _TIMEOUT_TOKENS.isdisjoint(_error_words(error))
+
+
+def describe_error(error):
+    """
+    Turn an exception from a Watson X request into a message for the UI.
+    
+    Args:
+        error: The exception raised by the client
         
-        # Extract response content
-        if hasattr(response, 'choices') and len(response.choices) > 0:
-            choice = response.choices[0]
-            if hasattr(choice, 'message') and hasattr(choice.message, 'content'):
-                full_response = choice.message.content
-            elif isinstance(choice, dict) and "message" in choice:
-                full_response = choice["message"].get("content", "")
-            else:
-                full_response = str(choice)
-        elif isinstance(response, dict):
-            if "choices" in response and len(response["choices"]) > 0:
-                full_response = response["choices"][0].get("message", {}).get("content", "")
-            else:
-                full_response = str(response)
-        else:
-            full_response = str(response)
+    Returns:
+        str: Message suitable for container.error
+    """
+    message = str(error)
+    match = _SUPPORTED_MODELS_RE.search(message)
+    if match:
+        supported = ", ".join(m.strip(" '\"\n") for m in match.group(1).split(","))
+        return _ERR_UNSUPPORTED_MODEL.format(supported=supported)
+    
+    if isinstance(error, _RequestSlotTimeout):
+        return _ERR_BUSY
+    if is_timeout_error(error):
+        return _ERR_TIMEOUT
+    
+    words = _error_words(message)
+    for keys, template in _ERROR_TABLE:
+        if not keys.isdisjoint(words):
+            return template.format(base_url=_IBM_BASE_URL, message=message)
+    return _ERR_GENERIC.format(message=message)
+
+
+def resolve_model_id(model_name):
+    """
+    Return the model to call, honouring an IBM_MODEL_ID override in the env.
+    """
+    return _IBM_MODEL_OVERRIDE or model_name
+
+
+def stream_text(messages, model_name, params):
+    """
+    Stream a response without touching the UI, for concurrent requests.
+    
+    Args:
+        messages: List of message dicts with 'role' and 'content'
+        model_name: Model identifier from dropdown
+        params: Generation parameters from the sidebar
         
-        # Display response
-        if full_response:
-            response_placeholder.markdown(full_response)
-            return full_response
-        else:
-            response_placeholder.error("No response received from Watson X")
-            return None
-            
-    except Exception as e:
-        error_msg = f"Error: {e}"
-        container.error(error_msg)
-        print(f"Watson X error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-
-
-def stream_response(messages, container, model_name, params):
-    """
-    Main entry point for streaming responses.
-    Routes to Watson X chat.
+    Yields:
+        str: Pieces of the response text as they arrive
+
+    Raises:
+        ValueError: If the Watson X settings are missing from the env
+        Exception: Any error from the Watson X client is propagated
+    """
+    if not _IBM_READY:
+        raise ValueError(_IBM_ERROR)
+    return iter_chat_text(messages, resolve_model_id(model_name), params)
+
+
+def complete_response(messages, model_name, params):
+    """
+    Blocking, non-UI request returning the whole response at once.
     
     Args:
         messages: List of message dicts with 'role' and 'content'
-        container: Streamlit container for displaying response
         model_name: Model identifier from dropdown
+        params: Generation parameters from the sidebar
         
     Returns:
-        str: Response text or None
+        str: Response text
+
+    Raises:
+        ValueError: If the Watson X settings are missing from the env
+        Exception: Any error from the Watson X client is propagated
     """
-    # Determine actual model ID (check for override in env)
-    actual_model_id = os.getenv("IBM_MODEL_ID") or model_name
-    
-    return chat_with_watsonx(messages, actual_model_id, container, params)
+    if not _IBM_READY:
+        raise ValueError(_IBM_ERROR)
+    return chat_text(messages, resolve_model_id(model_name), params)
@@ -1,13 +1,23 @@
 
 ## origin prompt templates
-def get_translation_prompt(text, source_lang, target_lang, cultural_context):
+def get_shared_context(text, source_lang, target_lang):
     """
-    Returns a prompt for translating the given text while considering cultural context.
+    Returns the system message shared by every analysis of the same text.
+    Keeping it identical across requests lets the server reuse the prefix.
     """
     return f"""
-    As an advanced cultural translation assistant, translate the following text from {source_lang} to {target_lang}, adapting it to a {cultural_context} context:
+    You are a multilingual translation assistant, grammar expert and cross-cultural communication expert.
+    The user is working with the following {source_lang} text, with {target_lang} as the target language:
 
     "{text}"
+    """
+
+def get_translation_prompt(text, source_lang, target_lang, cultural_context):
+    """
+    Returns (system, user) messages for translating the given text while considering cultural context.
+    """
+    return get_shared_context(text, source_lang, target_lang), f"""
+    Translate the text from {source_lang} to {target_lang}, adapting it to a {cultural_context} context.
 
     Provide your response in markdown format as follows, using Streamlit's markdown capabilities for enhanced visual appeal:
 
@@ -25,14 +35,12 @@ def get_translation_prompt(text, source_lang, target_lang, cultural_context):
     - **Key Challenges**: [Discuss any particularly challenging aspects of the translation]
     """ 
 
-def get_sentiment_analysis_prompt(text, source_lang):
+def get_sentiment_analysis_prompt(text, source_lang, target_lang):
     """
-    Returns a prompt for conducting sentiment analysis on a given text.
+    Returns (system, user) messages for conducting sentiment analysis on a given text.
     """
-    return f"""
-    Conduct a comprehensive sentiment analysis of the following {source_lang} text:
-
-    "{text}"
+    return get_shared_context(text, source_lang, target_lang), f"""
+    Conduct a comprehensive sentiment analysis of the {source_lang} text.
 
     Provide your analysis in markdown format as follows:
 
@@ -112,21 +120,16 @@ def get_language_standards(text, source_lang, target_lang):
 
 def get_grammar_focus(text, source_lang, target_lang):
     """
-    Builds a structured prompt for translation, verb/tense comparison,
+    Builds (system, user) messages for translation, verb/tense comparison,
     and cross-linguistic grammar analysis.
     """
-    return f"""
-        You are a multilingual translation and grammar expert.
-
+    return get_shared_context(text, source_lang, target_lang), f"""
         Your task is to:
         1. Translate the text from **{source_lang}** to **{target_lang}**.
         2. Identify and explain the key **verbs**, **tenses**, and **grammatical structures** in the source text.
         3. Compare how those same verbs/tenses/structures are expressed in the target language.
         4. Highlight any cultural or contextual nuances that influence the translation.
 
-        Text to analyze:
-        "{text}"
-
         Respond in the following markdown structure (optimized for Streamlit):
 
         ## :blue[Translation]
@@ -152,21 +155,16 @@ def get_grammar_focus(text, source_lang, target_lang):
 # testing new prompt (ed streamlit project)
 def get_comms_focus(text, source_lang, target_lang):
     """
-    Builds a structured prompt for translation, verb/tense comparison,
+    Builds (system, user) messages for translation, verb/tense comparison,
     and cross-linguistic grammar analysis.
     """
-    return f"""
-        You are a multilingual translation assistant and grammar expert.
-
+    return get_shared_context(text, source_lang, target_lang), f"""
         Your task is to:
         1. Translate the text from **{source_lang}** to **{target_lang}**.
         2. Identify and explain the key **verbs**, **tenses**, and **grammatical structures** in the source text.
         3. Compare how those same verbs/tenses/structures are expressed in the target language (if applicable).
         4. Highlight any cultural or contextual nuances that influence the translation.
 
-        Text to analyze:
-        "{text}"
-
         Respond in the following markdown structure (optimized for Streamlit):
 
         ## :blue[Translation]
@@ -191,4 +189,35 @@ def get_comms_focus(text, source_lang, target_lang):
         - **Structural Differences**: Key grammar differences between {source_lang} and {target_lang}.
         - **Cultural Considerations**: Any cultural or contextual elements that shaped the translation.
         - **Challenges**: Note any tricky grammar, idioms, or tense mismatches.
-        """
\ No newline at end of file
+        """
+
+def get_combined_analysis_prompt(text, source_lang, target_lang, cultural_context, keys=None):
+    """
+    Builds (system, user) messages covering the analyses named in `keys`
+    (default: translation, sentiment, grammar and comms), answered as one
+    JSON object with one entry per key.
+    """
+    tasks = {
+        "translation": f"""Translate the text from {source_lang} to {target_lang}, adapting it to a {cultural_context} context.
+           Use the sections "## :blue[Translation]", "## :green[Cultural Adaptations]" and "## :red[Linguistic Analysis]".""",
+        "sentiment": f"""Conduct a sentiment analysis of the {source_lang} text.
+           Use the sections "## :blue[Overall Sentiment]", "## :green[Sentiment Breakdown]" (positivity/negativity/neutrality scores from 0 to 1),
+           "## :orange[Key Emotional Indicators]" and "## :earth_americas: Cultural Context".""",
+        "grammar": f"""Translate the text to {target_lang} and compare its key verbs, tenses and grammatical structures across both languages.
+           Use the sections "## :blue[Translation]", "## :orange[Verb & Tense Comparison]" and "## :red[Linguistic Analysis]".""",
+        "comms": f"""As a translation assistant for teacher communication, translate the text to {target_lang} and compare key verbs/tenses in a markdown table
+           with the columns Source, Target, Tense/Aspect and Explanation, followed by "## :red[Linguistic Analysis]".""",
+    }
+    keys = list(tasks) if keys is None else list(keys)
+    steps = "\n".join(f"        {i}. **{key}**: {tasks[key]}" for i, key in enumerate(keys, 1))
+    shape = ", ".join(f'"{key}": "..."' for key in keys)
+    return get_shared_context(text, source_lang, target_lang), f"""
+        Complete each of the tasks below for the text.
+
+{steps}
+
+        Respond with ONLY a JSON object, no code fences and no text before or after it:
+        {{{shape}}}
+
+        Each value is a markdown string with newlines escaped as \\n.
+        """